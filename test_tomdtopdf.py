@@ -0,0 +1,117 @@
+"""
+Tests for the markdown parsing helpers in tomdtopdf.py.
+
+Run with `python -m pytest`.
+"""
+
+import io
+
+import pytest
+
+import tomdtopdf
+
+
+def toc(markdown):
+    """
+    Returns the table of contents tomdtopdf builds for a markdown string.
+    """
+    pytest.importorskip("markdown_it")
+    pytest.importorskip("mdit_py_plugins")
+    return tomdtopdf.build_toc(tomdtopdf._get_md().parse(markdown))
+
+
+def test_build_toc_nests_deeper_headings():
+    assert toc("# A\n\n## B\n\n### C\n\n## D\n\n# E\n") == (
+        '<div class="toc">\n<ul>\n'
+        '<li><a href="#a">A</a><ul>\n'
+        '<li><a href="#b">B</a><ul>\n'
+        '<li><a href="#c">C</a></li>\n</ul>\n</li>\n'
+        '<li><a href="#d">D</a></li>\n</ul>\n</li>\n'
+        '<li><a href="#e">E</a></li>\n'
+        "</ul>\n</div>\n"
+    )
+
+
+def test_build_toc_keeps_one_outer_list_for_shallower_headings():
+    html = toc("## A\n\n### A1\n\n# B\n")
+    assert html.count("<ul>") == 2
+    assert html == (
+        '<div class="toc">\n<ul>\n'
+        '<li><a href="#a">A</a><ul>\n'
+        '<li><a href="#a1">A1</a></li>\n</ul>\n</li>\n'
+        '<li><a href="#b">B</a></li>\n'
+        "</ul>\n</div>\n"
+    )
+
+
+def test_build_toc_keeps_siblings_under_a_skipped_level_in_one_list():
+    assert toc("# A\n\n### B\n\n## C\n") == (
+        '<div class="toc">\n<ul>\n'
+        '<li><a href="#a">A</a><ul>\n'
+        '<li><a href="#b">B</a></li>\n'
+        '<li><a href="#c">C</a></li>\n</ul>\n</li>\n'
+        "</ul>\n</div>\n"
+    )
+
+
+def test_build_toc_skips_empty_headings():
+    html = toc("# A\n\n#\n\n# B\n")
+    assert 'href="#"' not in html
+    assert html.count("<li>") == 2
+
+
+def test_empty_heading_gets_an_id():
+    pytest.importorskip("markdown_it")
+    pytest.importorskip("mdit_py_plugins")
+    md = tomdtopdf._get_md()
+    assert 'id=""' not in md.render("#\n")
+
+
+def test_build_toc_escapes_titles():
+    assert '<a href="#a--b">a &lt; b</a>' in toc("# a < b\n")
+
+
+def test_build_toc_without_headings():
+    assert toc("just text\n") == '<div class="toc">\n</div>\n'
+
+
+def split(text):
+    """
+    Runs split_frontmatter over an in-memory file.
+    """
+    pytest.importorskip("yaml")
+    return tomdtopdf.split_frontmatter(io.StringIO(text))
+
+
+def test_split_frontmatter_reads_header_and_body():
+    metadata, content = split("---\ntitle: T\nversion: 1\n---\n\n# Body\n---\nmore\n")
+    assert metadata == {"title": "T", "version": 1}
+    assert content == "# Body\n---\nmore"
+
+
+def test_split_frontmatter_skips_leading_blank_lines():
+    assert split("\n\n---\ntitle: T\n---\n# Body\n") == ({"title": "T"}, "# Body")
+
+
+def test_split_frontmatter_without_header():
+    assert split("# Body\n\ntext\n") == ({}, "# Body\n\ntext")
+
+
+def test_split_frontmatter_ignores_non_mapping_header():
+    assert split("---\n- a\n- b\n---\n# Body\n") == ({}, "# Body")
+
+
+def test_split_frontmatter_rejects_unclosed_header():
+    with pytest.raises(ValueError):
+        split("---\ntitle: T\n# Body\n")
+
+
+@pytest.mark.parametrize("content", ["# Title\n", "text\n   ## Sub\n", "#\n"])
+def test_content_check_accepts_atx_headings(content):
+    tomdtopdf.content_check(content)
+
+
+@pytest.mark.parametrize("content", ["#Title\n", "    # code\n", "####### seven\n"])
+def test_content_check_rejects_text_markdown_it_does_not_parse_as_heading(content):
+    with pytest.raises(SystemExit):
+        tomdtopdf.content_check(content)
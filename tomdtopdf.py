@@ -5,7 +5,11 @@ tomdtopdf.py
 Read and parses YAML Frontmatter markdown files, applies a HTML+CSS template,
 and generates a PDF file with native pagination and a linked table of contents.
 
-`python project.py <template file> <markdown file>`
+`python tomdtopdf.py <template file> <markdown file> [<markdown file> ...]`
+
+Several markdown files may be given at once; they are converted in
+parallel worker processes (`--jobs`, default: one per CPU), each reusing
+its template environment and font configuration across documents.
 
 Source files must be in 'YAML Frontmatter' format: a markdown file (`.md`)
 with a YAML header (separated by `---`).
@@ -24,11 +28,87 @@ Included files:
 
 import sys
 import os
-from argparse import ArgumentParser
-from frontmatter import load
-from markdown import Markdown
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+import re
+from argparse import ArgumentParser, ArgumentTypeError
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from html import escape
+from itertools import repeat
+from mimetypes import guess_type
+from urllib.parse import urljoin, urlparse
+from urllib.request import url2pathname
+
+_IMG_SRC = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+# CommonMark ATX heading: '#Title' without a space is a paragraph, not a title
+_HAS_HEADING = re.compile(r"^ {0,3}#{1,6}(?:[ \t]|$)", re.MULTILINE)
+_SLUG_DROP = re.compile(r"[^\w\u4e00-\u9fff\- ]")
+_FM_BOUNDARY = re.compile(r"-{3,}\s*$")
+_REQUIRED_FIELDS = frozenset(("title", "version", "date_modified", "pdf_filename"))
+# Relative image paths in the document resolve against the launch directory
+_BASE_URL = os.getcwd()
+
+
+@lru_cache(maxsize=8)
+def _get_env(template_dir):
+    """
+    Returns a Jinja2 environment for the template directory, built once.
+    Compiled templates are kept in Jinja2's per-user temporary bytecode
+    cache so later runs skip parsing the template source.
+    """
+    from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+    return Environment(
+        loader=FileSystemLoader(template_dir),
+        bytecode_cache=FileSystemBytecodeCache(),
+        auto_reload=False,
+        cache_size=400,
+    )
+
+
+def _slugify(title):
+    """
+    Turns a heading title into an id, GitHub-style like the anchors plugin's
+    default. Empty headings get "_" so they still have something to link to.
+    """
+    return _SLUG_DROP.sub("", title.strip().lower().replace(" ", "-")) or "_"
+
+
+@lru_cache(maxsize=1)
+def _get_md():
+    """
+    Returns a shared markdown-it parser with tables and heading ids enabled.
+    """
+    from markdown_it import MarkdownIt
+    from mdit_py_plugins.anchors import anchors_plugin
+
+    return (
+        MarkdownIt("commonmark", {"html": True})
+        .enable("table")
+        .use(anchors_plugin, max_level=6, slug_func=_slugify)
+    )
+
+
+@lru_cache(maxsize=1)
+def _get_font_config():
+    """
+    Returns the WeasyPrint font configuration shared by this process.
+    """
+    from weasyprint.text.fonts import FontConfiguration
+
+    return FontConfiguration()
+
+
+def _positive_int(value):
+    """
+    Argparse type for options that need an integer of at least 1.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise ArgumentTypeError(f"must be a positive integer, got {value!r}")
+    return number
 
 
 def arguments():
@@ -40,19 +120,53 @@ def arguments():
     parser.add_argument(
         "template_location", type=str, help="Location of the template file."
     )
-    parser.add_argument("md_location", type=str, help="Md file location.")
+    parser.add_argument("md_location", type=str, nargs="+", help="Md file location(s).")
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=_positive_int,
+        default=None,
+        help="Number of worker processes (default: one per CPU).",
+    )
     args = parser.parse_args()
     return args
 
 
-def load_doc(args):
+def split_frontmatter(openfile):
+    """
+    Splits an open YAML Frontmatter file into its metadata and content.
+    Only the header lines are collected for the YAML parser; the body is
+    read in one go once the closing `---` has been seen.
+    """
+    import yaml
+
+    first = openfile.readline()
+    while first and not first.strip():
+        first = openfile.readline()
+    if not _FM_BOUNDARY.match(first):
+        return {}, (first + openfile.read()).strip()
+    header = []
+    for line in openfile:
+        if _FM_BOUNDARY.match(line):
+            break
+        header.append(line)
+    else:
+        raise ValueError("YAML header is not closed with '---'")
+    # Use the libyaml accelerator when PyYAML was built with it
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+    metadata = yaml.load("".join(header), Loader=loader)
+    if not isinstance(metadata, dict):
+        metadata = {}
+    return metadata, openfile.read().strip()
+
+
+def load_doc(md_location):
     """
-    Load and parse the file contents and metadata with the Frontmatter module.
+    Load and parse the file contents and metadata with the PyYAML module.
     """
     try:
-        with open(args.md_location, "r", encoding="utf-8") as openfile:
-            post = load(openfile)
-        metadata, content = post.metadata, post.content
+        with open(md_location, "r", encoding="utf-8") as openfile:
+            metadata, content = split_frontmatter(openfile)
     except Exception as e:
         print(f"load_doc() failed to load or parse input doc: {e}.")
         sys.exit(1)
@@ -63,11 +177,13 @@ def field_check(metadata):
     """
     Checks for required metadata fields and quits if any are missing.
     """
-    required_fields = ["title", "version", "date_modified", "pdf_filename"]
-    for field in required_fields:
-        if field not in metadata or not metadata[field]:
-            print(f"Metadata field '{field}' is missing or empty.")
-            sys.exit(1)
+    missing = _REQUIRED_FIELDS.difference(
+        field for field, value in metadata.items() if value
+    )
+    if missing:
+        fields = ", ".join(f"'{field}'" for field in sorted(missing))
+        print(f"Metadata field(s) {fields} missing or empty.")
+        sys.exit(1)
 
 
 def content_check(content):
@@ -77,65 +193,162 @@ def content_check(content):
     if not content:
         print("Markdown content not present.")
         sys.exit(1)
-    if not any(line.strip().startswith("#") for line in content.split("\n")):
+    if not _HAS_HEADING.search(content):
         print("Suspiciously, the Markdown content does not contain a title; exiting.")
         sys.exit(1)
 
 
+def build_toc(tokens):
+    """
+    Builds a nested list of links to every titled heading from markdown-it
+    tokens. Like python-markdown's toc, a heading shallower than the list it
+    follows joins the nearest enclosing list it fits, so skipped levels and
+    headings above the first one never open a second list.
+    """
+    parts = []
+    levels = []
+    for index, token in enumerate(tokens):
+        if token.type != "heading_open":
+            continue
+        level = int(token.tag[1])
+        title = "".join(
+            child.content
+            for child in tokens[index + 1].children
+            if child.type in ("text", "code_inline")
+        )
+        if not title:
+            continue
+        while levels and level < levels[-1]:
+            if len(levels) == 1 or level > levels[-2]:
+                # Falls between this list and its parent: take over its level
+                levels[-1] = level
+                break
+            parts.append("</li>\n</ul>\n")
+            levels.pop()
+        if levels and level == levels[-1]:
+            parts.append("</li>\n")
+        else:
+            parts.append("<ul>\n")
+            levels.append(level)
+        parts.append(f'<li><a href="#{token.attrGet("id")}">{escape(title)}</a>')
+    parts.append("</li>\n</ul>\n" * len(levels))
+    return '<div class="toc">\n' + "".join(parts) + "</div>\n"
+
+
 def md2html(metadata, content, template_location):
     """
-    Convert MD to HTML with the Markdown and Jinja2 modules.
+    Convert MD to HTML with the markdown-it and Jinja2 modules.
     """
     try:
         # Convert Markdown to HTML
-        md = Markdown(extensions=["toc", "tables"])
-        html_content = md.convert(content)
-        toc_html = md.toc
+        md = _get_md()
+        tokens = md.parse(content)
+        html_content = md.renderer.render(tokens, md.options, {})
+        toc_html = build_toc(tokens)
 
         # Set up Jinja2 environment
         template_dir, template_file = os.path.split(template_location)
         template_dir = template_dir if template_dir else "."
-        env = Environment(loader=FileSystemLoader(template_dir))
+        env = _get_env(template_dir)
         template = env.get_template(template_file)
 
         # Render HTML with context
         context = {**metadata, "content": html_content, "toc": toc_html}
-        html = template.render(context)
-
-        # Return HTML content and template directory
-        return html, template_dir
+        return template.render(context)
 
     except Exception as e:
         print(f"md2html() failed to convert md to html: {e}.")
         sys.exit(1)
 
 
+def _read_bytes(path):
+    """
+    Reads a local file, returning None if it cannot be read.
+    """
+    try:
+        with open(path, "rb") as openfile:
+            return openfile.read()
+    except OSError:
+        return None
+
+
+def prefetch_fetcher(html, base_url):
+    """
+    Reads the local images referenced by the HTML concurrently and returns a
+    Weasyprint URLFetcher that serves them from memory. Anything not
+    prefetched falls through to Weasyprint's own fetching.
+    """
+    from weasyprint.urls import URLFetcher, URLFetcherResponse, iri_to_uri, path2url
+
+    # Build keys the way Weasyprint resolves relative URLs (abspath-based)
+    base = path2url(os.path.abspath(base_url))
+    urls = {iri_to_uri(urljoin(base, src)) for src in _IMG_SRC.findall(html)}
+    urls = [url for url in urls if urlparse(url).scheme == "file"]
+    paths = [url2pathname(urlparse(url).path) for url in urls]
+    with ThreadPoolExecutor() as executor:
+        cache = dict(zip(urls, executor.map(_read_bytes, paths)))
+
+    class PrefetchFetcher(URLFetcher):
+        """
+        URLFetcher that answers each prefetched file URL once from memory.
+        """
+
+        def fetch(self, url, headers=None):
+            # Each image is fetched once; drop the buffer as it is handed over
+            data = cache.pop(url, None)
+            if data is None:
+                return super().fetch(url, headers)
+            mime_type = guess_type(url)[0]
+            headers = {"Content-Type": mime_type} if mime_type else {}
+            return URLFetcherResponse(url, data, headers)
+
+    return PrefetchFetcher()
+
+
 def html2pdf(metadata, html):
     """
     Render and write the PDF with the Weasyprint module.
     """
     try:
+        from weasyprint import HTML
+
         if not metadata.get("pdf_filename"):
             raise ValueError("Cannot access file from pdf_filename.")
-        # Updated base_url to properly resolve image paths
-        HTML(string=html, base_url=os.getcwd()).write_pdf(metadata["pdf_filename"])
+        url_fetcher = prefetch_fetcher(html, _BASE_URL)
+        document = HTML(
+            string=html,
+            base_url=_BASE_URL,
+            url_fetcher=url_fetcher,
+        )
+        del html  # already parsed into the document; free it before layout
+        document.write_pdf(metadata["pdf_filename"], font_config=_get_font_config())
     except Exception as e:
         print(f"html2pdf() failed to generate PDF: {e}.")
         sys.exit(1)
 
 
+def convert(md_location, template_location):
+    """
+    Runs the full md -> html -> pdf pipeline for one markdown file.
+    """
+    metadata, content = load_doc(md_location)  # extract metadata + content
+    field_check(metadata)  # field check
+    content_check(content)  # content check
+    html2pdf(metadata, md2html(metadata, content, template_location))  # render PDF
+
+
 def main():
     """
     Orchestrates the workflow.
     """
     args = arguments()  # get arguments
-    metadata, content = load_doc(args)  # extract metadata + content
-    field_check(metadata)  # field check
-    content_check(content)  # content check
-    html, template_dir = md2html(
-        metadata, content, args.template_location
-    )  # render HTML
-    html2pdf(metadata, html)  # render PDF
+    if len(args.md_location) == 1 or args.jobs == 1:
+        for md_location in args.md_location:
+            convert(md_location, args.template_location)
+        return
+    # Layout is CPU-bound, so fan documents out across processes
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        list(executor.map(convert, args.md_location, repeat(args.template_location)))
 
 
 if __name__ == "__main__":